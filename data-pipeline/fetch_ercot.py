@@ -3,13 +3,61 @@
 Fetch ERCOT Generation Interconnection Queue data via gridstatus library.
 """
 
-import json
 import logging
+import re
 from datetime import datetime, timezone
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
 
+import orjson
+import pandas as pd
+import polars as pl
+
+from pipeline_common import ORJSON_OPTIONS, SESSION
+
 logging.basicConfig(level=logging.INFO)
 
+# Normalize fuel types to dashboard categories (checked in order)
+FUEL_CATEGORY_PATTERNS = {
+    "Solar": "solar|photovoltaic",
+    "Wind": "wind",
+    "Gas": "gas|natural gas",
+    "Battery Storage": "battery|storage",
+    "Nuclear": "nuclear",
+    "Coal": "coal",
+    "Other": "biomass|hydrogen|other",
+}
+_FUEL_CATEGORIES = tuple(FUEL_CATEGORY_PATTERNS)
+# One group per category; every branch is anchored at the start of the string,
+# so the regex engine tries them in order and the earliest category wins
+_FUEL_RE = re.compile("|".join(f"(.*?(?:{p}))" for p in FUEL_CATEGORY_PATTERNS.values()), re.DOTALL)
+
+
+@lru_cache(maxsize=512)
+def categorize_fuel(fuel):
+    """Map a raw fuel/technology string to its dashboard category."""
+    m = _FUEL_RE.match(str(fuel).lower())
+    return _FUEL_CATEGORIES[m.lastindex - 1] if m else "Other"
+
+
+def header_names(header):
+    """
+    Column names for a raw header row, named the way pandas' own header
+    parsing does: blanks become "Unnamed: N", repeats become "X.1", "X.2", ...
+    """
+    names = [str(c) if pd.notna(c) else f"Unnamed: {i}" for i, c in enumerate(header)]
+    counts = {}
+    for i, name in enumerate(names):
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
 
 def fetch_ercot_queue():
     """Fetch ERCOT interconnection queue using gridstatus."""
@@ -31,15 +79,11 @@ def fetch_ercot_queue():
 
 def fetch_ercot_direct():
     """Fallback: fetch GIS report directly from ERCOT API."""
-    import requests
-    import pandas as pd
-    from io import BytesIO
-
     try:
         # Get document list
         list_url = "https://www.ercot.com/misapp/servlets/IceDocListJsonWS"
         params = {"reportTypeId": "15933"}
-        r = requests.get(list_url, params=params, timeout=30)
+        r = SESSION.get(list_url, params=params, timeout=30)
         r.raise_for_status()
         data = r.json()
 
@@ -54,22 +98,25 @@ def fetch_ercot_direct():
         friendly_name = doc.get("FriendlyName", "unknown")
         print(f"Downloading: {friendly_name} (DocID: {doc_id})")
 
-        # Download the Excel file
+        # Download the Excel file. An .xlsx is a zip archive that can only be
+        # read with the whole file in hand, so there's nothing to gain from
+        # streaming the body
         dl_url = f"https://www.ercot.com/misdownload/servlets/mirDownload?doclookupId={doc_id}"
-        r2 = requests.get(dl_url, timeout=120)
+        r2 = SESSION.get(dl_url, timeout=120)
         r2.raise_for_status()
 
-        # Read Project Details sheet (skip header rows)
-        for skip in range(6):
-            try:
-                df = pd.read_excel(BytesIO(r2.content), sheet_name="Project Details - Large Gen",
-                                   header=skip, engine="openpyxl")
-                named_cols = [c for c in df.columns if "Unnamed" not in str(c)]
-                if len(named_cols) > 5:
-                    print(f"Parsed Excel with header at row {skip}: {len(df)} rows")
-                    return df
-            except Exception:
-                continue
+        # Read Project Details sheet once, then find the header row among
+        # the leading rows in memory (skip title rows above it)
+        raw = pd.read_excel(BytesIO(r2.content), sheet_name="Project Details - Large Gen",
+                            header=None, engine="calamine")
+        for skip in range(min(6, len(raw))):
+            header = raw.iloc[skip]
+            named_cols = [c for c in header if pd.notna(c) and str(c).strip()]
+            if len(named_cols) > 5:
+                df = raw.iloc[skip + 1:].reset_index(drop=True).infer_objects()
+                df.columns = header_names(header)
+                print(f"Parsed Excel with header at row {skip}: {len(df)} rows")
+                return df
 
         print("Could not parse ERCOT Excel file")
         return None
@@ -121,56 +168,62 @@ def process_queue_data(df):
         "by_county": {},
     }
 
-    # Normalize fuel types to dashboard categories
-    fuel_map = {
-        "solar": "Solar", "photovoltaic": "Solar", "photovoltaic solar": "Solar",
-        "wind": "Wind", "wind turbine": "Wind",
-        "gas": "Gas", "natural gas": "Gas", "gas-cc": "Gas", "gas-ct": "Gas",
-        "gas-ic": "Gas", "gas-st": "Gas", "gas - cc": "Gas", "gas - ct": "Gas",
-        "battery": "Battery Storage", "battery storage": "Battery Storage",
-        "storage": "Battery Storage", "energy storage": "Battery Storage",
-        "nuclear": "Nuclear", "coal": "Coal", "biomass": "Other",
-        "hydrogen": "Other", "other": "Other",
-    }
-
-    if fuel_col and cap_col:
-        import pandas as pd
+    if cap_col:
         df[cap_col] = pd.to_numeric(df[cap_col], errors="coerce")
 
-        # Map fuel types
-        df["_fuel_category"] = df[fuel_col].astype(str).str.lower().str.strip().map(
-            lambda x: next((v for k, v in fuel_map.items() if k in x), "Other")
+    # Aggregate in Polars over only the columns we need; text columns go
+    # through pandas' nullable string dtype so missing values stay null.
+    text_cols = [c for c in (fuel_col, status_col, county_col) if c]
+    pldf = pl.from_pandas(
+        df[[c for c in (cap_col, *text_cols) if c]].astype({c: "string" for c in text_cols})
+    )
+
+    if fuel_col and cap_col:
+        # Only a few dozen distinct fuel strings, so classify each one once
+        fuel_lookup = {f: categorize_fuel(f) for f in pldf[fuel_col].drop_nulls().unique()}
+        fuel_category = (
+            pl.col(fuel_col).replace_strict(fuel_lookup, default="Other", return_dtype=pl.String)
+            .fill_null("Other")
         )
 
-        fuel_summary = df.groupby("_fuel_category")[cap_col].agg(["sum", "count"]).reset_index()
-        for _, row in fuel_summary.iterrows():
-            cat = row["_fuel_category"]
-            if cat and str(cat).lower() not in ("nan", "none", ""):
-                result["by_fuel_type"][cat] = {
-                    "capacity_mw": round(float(row["sum"]), 1) if not pd.isna(row["sum"]) else 0,
-                    "capacity_gw": round(float(row["sum"]) / 1000, 2) if not pd.isna(row["sum"]) else 0,
-                    "count": int(row["count"]),
-                }
+        fuel_summary = (
+            pldf.with_columns(fuel_category.alias("_fuel_category"))
+            .group_by("_fuel_category")
+            .agg(pl.col(cap_col).sum().alias("sum"), pl.col(cap_col).count().alias("count"))
+            .sort("_fuel_category")
+        )
+        for row in fuel_summary.to_dicts():
+            result["by_fuel_type"][row["_fuel_category"]] = {
+                "capacity_mw": round(float(row["sum"]), 1),
+                "capacity_gw": round(float(row["sum"]) / 1000, 2),
+                "count": int(row["count"]),
+            }
 
-        result["total_capacity_gw"] = round(df[cap_col].sum() / 1000, 1)
+        result["total_capacity_gw"] = round(pldf[cap_col].sum() / 1000, 1)
 
     # Status breakdown
     if status_col:
-        import pandas as pd
-        counts = df[status_col].value_counts().to_dict()
-        result["by_status"] = {str(k): int(v) for k, v in counts.items()
-                               if pd.notna(k) and str(k).lower() not in ("nan", "none", "")}
+        counts = (
+            pldf[status_col].drop_nulls().value_counts()
+            .sort(["count", status_col], descending=[True, False])
+        )
+        result["by_status"] = {str(k): int(v) for k, v in counts.iter_rows()
+                               if str(k).lower() not in ("nan", "none", "")}
 
     # County breakdown (top 15)
     if county_col and cap_col:
-        import pandas as pd
-        county_agg = df.groupby(county_col)[cap_col].agg(["sum", "count"]).reset_index()
-        county_agg = county_agg.nlargest(15, "sum")
-        for _, row in county_agg.iterrows():
+        county_agg = (
+            pldf.drop_nulls(county_col)
+            .group_by(county_col)
+            .agg(pl.col(cap_col).sum().alias("sum"), pl.col(cap_col).count().alias("count"))
+            .sort(["sum", county_col], descending=[True, False])
+            .head(15)
+        )
+        for row in county_agg.to_dicts():
             name = str(row[county_col]).strip()
             if name and name.lower() not in ("nan", "none", ""):
                 result["by_county"][name] = {
-                    "capacity_mw": round(float(row["sum"]), 1) if not pd.isna(row["sum"]) else 0,
+                    "capacity_mw": round(float(row["sum"]), 1),
                     "count": int(row["count"]),
                 }
 
@@ -187,8 +240,8 @@ def main():
         summary = process_queue_data(df)
         if summary:
             output_file = output_dir / "ercot_queue.json"
-            with open(output_file, "w") as f:
-                json.dump(summary, f, indent=2, default=str)
+            with open(output_file, "wb") as f:
+                f.write(orjson.dumps(summary, option=ORJSON_OPTIONS))
             print(f"ERCOT data saved to {output_file}")
             print(f"  Total projects: {summary['total_projects']}")
             print(f"  Total capacity: {summary['total_capacity_gw']} GW")
@@ -4,23 +4,35 @@ Fetch Texas Railroad Commission enforcement/violations data.
 Downloads VIOLATIONS.txt from RRC MFT portal (pipe-delimited, updated weekly).
 """
 
-import json
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-import requests
-from bs4 import BeautifulSoup
+import orjson
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
+
+from pipeline_common import (
+    ORJSON_OPTIONS, SESSION, extract_viewstate, load_cached, save_cache, source_fingerprint,
+)
+
+# VIOLATIONS.txt columns used by the dashboard
+VIOLATION_COLUMNS = [
+    'VIOLATION_DISC_DATE', 'OPERATOR_NAME', 'COUNTY', 'VIOLATED_RULE',
+    'VIOLATED_RULE_DESC', 'MAJOR_VIOL_IND', 'LAST_ENF_ACTION',
+]
+
+# Violations older than this are dropped (and never cached)
+VIOLATION_WINDOW_DAYS = 90
 
 
 def download_from_mft(mft_url, file_index=0):
     """Download a file from RRC MFT portal using PrimeFaces form submission."""
-    session = requests.Session()
-    r = session.get(mft_url, timeout=30)
-    soup = BeautifulSoup(r.text, 'html.parser')
-    vs_input = soup.find('input', {'name': 'javax.faces.ViewState'})
-    if not vs_input:
+    r = SESSION.get(mft_url, timeout=30)
+    viewstate = extract_viewstate(r.text)
+    if not viewstate:
         return None
-    viewstate = vs_input['value']
 
     file_id = f'fileTable:{file_index}:j_id_2f'
     data = {
@@ -28,21 +40,34 @@ def download_from_mft(mft_url, file_index=0):
         'javax.faces.ViewState': viewstate,
         file_id: file_id,
     }
-    r2 = session.post(
+    r2 = SESSION.post(
         'https://mft.rrc.texas.gov/webclient/godrive/PublicGoDrive.xhtml',
         data=data, timeout=300, stream=True
     )
 
     if 'force-download' in r2.headers.get('Content-Type', ''):
         return r2
+    r2.close()
     return None
 
 
+def decode_text_columns(table):
+    """Decode binary columns as UTF-8, replacing invalid bytes."""
+    return pa.table({
+        name: pa.array(
+            [v.decode('utf-8', errors='replace') if v is not None else None for v in col.to_pylist()],
+            type=pa.string(),
+        )
+        for name, col in zip(table.column_names, table.columns)
+    })
+
+
 def fetch_violations_data():
     """
     Fetch recent RRC violations from VIOLATIONS.txt.
     The file is pipe-delimited (}) with headers, updated weekly.
     File index 13 = VIOLATIONS.txt (statewide).
+    Returns a Polars DataFrame of recent violations, or None on failure.
     """
     print("Fetching RRC violations data...")
 
@@ -53,46 +78,56 @@ def fetch_violations_data():
         response = download_from_mft(mft_url, file_index=13)
         if response is None:
             print("MFT download failed")
-            return []
-
-        # Stream-read the file - it can be large (100MB+)
-        # Read header first, then collect recent violations
-        header = None
-        violations = []
-        buffer = ""
-        cutoff_date = (datetime.now() - timedelta(days=90)).strftime('%Y%m%d')
-
-        for chunk in response.iter_content(chunk_size=65536, decode_unicode=False):
-            buffer += chunk.decode('utf-8', errors='replace')
-            lines = buffer.split('\n')
-            buffer = lines[-1]  # Keep incomplete last line
-
-            for line in lines[:-1]:
-                line = line.strip()
-                if not line:
-                    continue
-
-                if header is None:
-                    header = line.split('}')
-                    continue
-
-                fields = line.split('}')
-                if len(fields) < len(header):
-                    continue
-
-                row = dict(zip(header, fields))
-
-                # Filter to recent violations (last 90 days)
-                viol_date = row.get('VIOLATION_DISC_DATE', '')
-                if viol_date >= cutoff_date:
-                    violations.append(row)
-
-        print(f"Found {len(violations)} violations in last 90 days")
+            return None
+
+        cutoff_date = (datetime.now() - timedelta(days=VIOLATION_WINDOW_DAYS)).strftime('%Y%m%d')
+        cache_params = {'columns': VIOLATION_COLUMNS, 'window_days': VIOLATION_WINDOW_DAYS}
+
+        # The file is only republished weekly; skip the download body and
+        # parse when it hasn't changed since the cached run
+        fingerprint = source_fingerprint(response)
+        cached = load_cached('violations', fingerprint, cache_params)
+        if cached is not None:
+            response.close()
+            print("VIOLATIONS.txt unchanged since last run, using cached parse")
+            table = cached.to_arrow()
+        else:
+            # Stream the file - it can be large (100MB+) - through Arrow's
+            # incremental CSV reader, parsing only the columns we use and
+            # keeping only recent rows from each record batch. Columns are
+            # read as raw bytes so a stray non-UTF-8 byte in an old row can't
+            # fail the parse; only the rows we keep get decoded.
+            response.raw.decode_content = True
+            reader = pa_csv.open_csv(
+                response.raw,
+                parse_options=pa_csv.ParseOptions(
+                    delimiter='}', quote_char=False,
+                    invalid_row_handler=lambda row: 'skip',
+                ),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=VIOLATION_COLUMNS,
+                    column_types={col: pa.binary() for col in VIOLATION_COLUMNS},
+                ),
+            )
+            cutoff = pa.scalar(cutoff_date.encode(), pa.binary())
+            table = decode_text_columns(pa.Table.from_batches(
+                [batch.filter(pc.greater_equal(batch.column('VIOLATION_DISC_DATE'), cutoff))
+                 for batch in reader],
+                schema=reader.schema,
+            ))
+            save_cache('violations', fingerprint, pl.from_arrow(table), cache_params)
+
+        # Filter to recent violations; cached rows were cut
+        # at an earlier date, so the window has to be re-applied
+        table = table.filter(pc.greater_equal(table['VIOLATION_DISC_DATE'], cutoff_date))
+        violations = pl.from_arrow(table)
+
+        print(f"Found {len(violations)} violations in last {VIOLATION_WINDOW_DAYS} days")
         return violations
 
     except Exception as e:
         print(f"Error fetching violations: {e}")
-        return []
+        return None
 
 
 def generate_sample_enforcement():
@@ -119,17 +154,26 @@ def generate_sample_enforcement():
     ]
 
 
+def count_by(df, col, limit=None):
+    """Count rows per value of col, most frequent first."""
+    counts = df.group_by(col).len().sort(['len', col], descending=[True, False])
+    if limit:
+        counts = counts.head(limit)
+    return dict(counts.iter_rows())
+
+
 def process_enforcement_data(violations):
-    """Process violations into dashboard-ready summary."""
-    if not violations:
+    """Process violations (a DataFrame or list of row dicts) into dashboard-ready summary."""
+    df = pl.DataFrame(violations)
+    if df.is_empty():
         return None
 
     # Sort by date (most recent first)
-    violations.sort(key=lambda x: x.get('VIOLATION_DISC_DATE', ''), reverse=True)
+    df = df.sort('VIOLATION_DISC_DATE', descending=True, maintain_order=True)
 
     result = {
         "updated_at": datetime.now(timezone.utc).isoformat(),
-        "total_recent": len(violations),
+        "total_recent": len(df),
         "items": [],
         "by_type": {},
         "by_status": {},
@@ -138,7 +182,7 @@ def process_enforcement_data(violations):
     }
 
     # Top items for dashboard
-    for item in violations[:10]:
+    for item in df.head(10).to_dicts():
         viol_date = item.get('VIOLATION_DISC_DATE', '')
         try:
             if len(viol_date) == 8:
@@ -169,29 +213,10 @@ def process_enforcement_data(violations):
         })
 
     # Aggregations
-    action_counts = {}
-    county_counts = {}
-    major_count = 0
-    rule_counts = {}
-
-    for item in violations:
-        action = item.get('LAST_ENF_ACTION', 'Unknown')
-        action_counts[action] = action_counts.get(action, 0) + 1
-
-        county = item.get('COUNTY', 'Unknown')
-        if county:
-            county_counts[county] = county_counts.get(county, 0) + 1
-
-        if item.get('MAJOR_VIOL_IND', 'N') == 'Y':
-            major_count += 1
-
-        rule_desc = item.get('VIOLATED_RULE_DESC', 'Other')
-        rule_counts[rule_desc] = rule_counts.get(rule_desc, 0) + 1
-
-    result["by_status"] = action_counts
-    result["by_county"] = dict(sorted(county_counts.items(), key=lambda x: x[1], reverse=True)[:20])
-    result["by_type"] = dict(sorted(rule_counts.items(), key=lambda x: x[1], reverse=True)[:10])
-    result["major_violations"] = major_count
+    result["by_status"] = count_by(df, 'LAST_ENF_ACTION')
+    result["by_county"] = count_by(df.filter(pl.col('COUNTY') != ''), 'COUNTY', limit=20)
+    result["by_type"] = count_by(df, 'VIOLATED_RULE_DESC', limit=10)
+    result["major_violations"] = int(df['MAJOR_VIOL_IND'].eq('Y').sum())
 
     return result
 
@@ -202,12 +227,12 @@ def main():
     output_dir.mkdir(parents=True, exist_ok=True)
 
     violations = fetch_violations_data()
-    if violations:
+    if violations is not None:
         summary = process_enforcement_data(violations)
         if summary:
             output_file = output_dir / "rrc_enforcement.json"
-            with open(output_file, "w") as f:
-                json.dump(summary, f, indent=2, default=str)
+            with open(output_file, "wb") as f:
+                f.write(orjson.dumps(summary, option=ORJSON_OPTIONS))
             print(f"RRC enforcement data saved to {output_file}")
             print(f"  Total recent violations: {summary['total_recent']}")
             print(f"  Major violations: {summary['major_violations']}")
@@ -4,14 +4,17 @@ Fetch Texas Railroad Commission drilling permit data.
 Downloads current month permits from RRC MFT portal (daf420.dat).
 """
 
-import json
+import io
+import re
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+import orjson
+import polars as pl
 
+from pipeline_common import (
+    ORJSON_OPTIONS, SESSION, extract_viewstate, load_cached, save_cache, source_fingerprint,
+)
 
 # Texas Basins mapping (county to basin)
 TEXAS_BASINS = {
@@ -67,6 +70,19 @@ CITY_TO_COUNTY = {
     'ANDREWS, TX': 'ANDREWS',
 }
 
+# CITY_TO_COUNTY with ", TX" spellings also reachable by bare city name, so a
+# trailer city resolves in one lookup (exact spellings take precedence)
+CITY_COUNTY_LOOKUP = {
+    **{city.removesuffix(', TX'): county for city, county in CITY_TO_COUNTY.items()},
+    **CITY_TO_COUNTY,
+}
+
+# City name in a type-02 trailer follows a direction code (NE/SE/SW/NW/E/W/N/S)
+CITY_RE = re.compile(r'(?:NE|NW|SE|SW|N|S|E|W)\s{2,}([A-Z][A-Z ,\.]+?)\s{2,}')
+
+# A type-02 trailer must follow its type-01 master record within this many lines
+TRAILER_WINDOW = 10
+
 
 def get_basin(county):
     """Map county to basin."""
@@ -77,13 +93,10 @@ def get_basin(county):
 
 def download_from_mft(mft_url, file_index=0):
     """Download a file from RRC MFT portal using PrimeFaces form submission."""
-    session = requests.Session()
-    r = session.get(mft_url, timeout=30)
-    soup = BeautifulSoup(r.text, 'html.parser')
-    vs_input = soup.find('input', {'name': 'javax.faces.ViewState'})
-    if not vs_input:
+    r = SESSION.get(mft_url, timeout=30)
+    viewstate = extract_viewstate(r.text)
+    if not viewstate:
         return None
-    viewstate = vs_input['value']
 
     file_id = f'fileTable:{file_index}:j_id_2f'
     data = {
@@ -91,59 +104,62 @@ def download_from_mft(mft_url, file_index=0):
         'javax.faces.ViewState': viewstate,
         file_id: file_id,
     }
-    r2 = session.post(
+    r2 = SESSION.post(
         'https://mft.rrc.texas.gov/webclient/godrive/PublicGoDrive.xhtml',
-        data=data, timeout=120
+        data=data, timeout=120, stream=True
     )
 
     if 'force-download' in r2.headers.get('Content-Type', ''):
-        return r2.content
+        return r2
+    r2.close()
     return None
 
 
-def parse_daf420(content):
-    """Parse RRC daf420.dat fixed-width drilling permit file."""
-    permits = []
-    text = content.decode('utf-8', errors='replace')
-    lines = text.split('\n')
-
-    import re
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].rstrip()
-        if not line.startswith('01') or len(line) < 98:
-            i += 1
-            continue
-
-        # Type-01 master record — field positions from data analysis:
-        # Pos 58-65: Date (YYYYMMDD)
-        # Pos 66-97: Operator name (32 chars)
-        date_str = line[58:66]
-        operator = line[66:98].strip()
-
-        # Find matching type-02 trailer for county/city info
-        county = ''
-        city = ''
-        j = i + 1
-        while j < min(i + 10, len(lines)):
-            trailer = lines[j].rstrip()
-            if trailer.startswith('02') and len(trailer) > 200:
+def iter_daf420_records(lines):
+    """Yield (date, operator, city, county) for each type-01 record in daf420.dat lines."""
+    # Single pass: remember the last type-01 master record and emit it when
+    # its type-02 trailer (county/city info) or the next type-01 arrives
+    pending = None
+    for i, line in enumerate(lines):
+        if line.startswith('01'):
+            if pending:
+                yield pending[1], pending[2], '', ''
+                pending = None
+            line = line.rstrip()
+            if len(line) >= 98:
+                # Type-01 master record — field positions from data analysis:
+                # Pos 58-65: Date (YYYYMMDD)
+                # Pos 66-97: Operator name (32 chars)
+                pending = (i, line[58:66], line[66:98].strip())
+        elif line.startswith('02') and pending:
+            if i - pending[0] >= TRAILER_WINDOW:
+                yield pending[1], pending[2], '', ''
+                pending = None
+                continue
+            trailer = line.rstrip()
+            if len(trailer) > 200:
                 # City name appears in trailer after direction codes (NE/SE/SW/NW/E/W/N/S)
-                tail = trailer[180:]
-                city_match = re.search(
-                    r'(?:NE|NW|SE|SW|N|S|E|W)\s{2,}([A-Z][A-Z ,\.]+?)\s{2,}',
-                    tail
-                )
+                city = ''
+                county = ''
+                city_match = CITY_RE.search(trailer[180:])
                 if city_match:
                     city = city_match.group(1).strip().rstrip(',')
-                    county = CITY_TO_COUNTY.get(city, CITY_TO_COUNTY.get(city + ', TX', ''))
-                break
-            elif trailer.startswith('01'):
-                break
-            j += 1
+                    county = CITY_COUNTY_LOOKUP.get(city, '')
+                yield pending[1], pending[2], city, county
+                pending = None
+
+    if pending:
+        yield pending[1], pending[2], '', ''
+
 
-        # Parse date
+def parse_daf420(content):
+    """Parse RRC daf420.dat fixed-width drilling permit file."""
+    permits = []
+    # Decode and split lazily, one line at a time, instead of holding the
+    # decoded text and a list of every line alongside the raw bytes
+    lines = io.TextIOWrapper(io.BytesIO(content), encoding='utf-8', errors='replace', newline='\n')
+
+    for date_str, operator, city, county in iter_daf420_records(lines):
         permit_date = None
         try:
             if len(date_str) == 8 and date_str.isdigit():
@@ -156,12 +172,9 @@ def parse_daf420(content):
                 'permit_date': permit_date,
                 'county': county,
                 'city': city,
-                'basin': get_basin(county),
                 'operator': operator,
             })
 
-        i += 1
-
     return permits
 
 
@@ -174,10 +187,21 @@ def fetch_rrc_permit_data():
 
     try:
         print("Downloading current month permits from RRC MFT portal...")
-        content = download_from_mft(mft_url, file_index=0)
-        if content:
-            permits = parse_daf420(content)
-            print(f"Parsed {len(permits)} permits from daf420.dat")
+        response = download_from_mft(mft_url, file_index=0)
+        if response is not None:
+            fingerprint = source_fingerprint(response)
+            cached = load_cached('permits', fingerprint)
+            if cached is not None:
+                response.close()
+                permits = cached.to_dicts()
+                print(f"daf420.dat unchanged since last run, using {len(permits)} cached permits")
+            else:
+                # The POST is streamed only so a cache hit can skip the body;
+                # on a miss the whole file is read into memory here
+                permits = parse_daf420(response.content)
+                print(f"Parsed {len(permits)} permits from daf420.dat")
+                if permits:
+                    save_cache('permits', fingerprint, pl.DataFrame(permits))
             if permits:
                 return permits
     except Exception as e:
@@ -210,9 +234,20 @@ def process_permit_data(permits):
     if not permits:
         return None
 
-    df = pd.DataFrame(permits)
-    if 'permit_date' in df.columns:
-        df['permit_date'] = pd.to_datetime(df['permit_date'], errors='coerce')
+    # Parse dates, map counties to basins in one vectorized lookup, and apply
+    # the 30-day window lazily; every summary below is a query over this plan
+    cutoff = datetime.now() - timedelta(days=30)
+    recent = (
+        pl.LazyFrame(permits)
+        .with_columns(
+            pl.col('permit_date').str.strptime(pl.Date, '%Y-%m-%d', strict=False),
+            pl.col('county').str.strip_chars().str.to_uppercase()
+            .replace_strict(TEXAS_BASINS, default='Other', return_dtype=pl.String)
+            .fill_null('Other')
+            .alias('basin'),
+        )
+        .filter(pl.col('permit_date').cast(pl.Datetime) >= cutoff)
+    )
 
     result = {
         "updated_at": datetime.now(timezone.utc).isoformat(),
@@ -223,30 +258,25 @@ def process_permit_data(permits):
         "permit_velocity": {},
     }
 
-    cutoff = datetime.now() - timedelta(days=30)
-    recent = df[df['permit_date'] >= cutoff] if 'permit_date' in df.columns else df
-    result["total_permits_30d"] = len(recent)
-
-    if 'basin' in recent.columns:
-        basin_counts = recent['basin'].value_counts().to_dict()
-        result["by_basin"] = {str(k): int(v) for k, v in basin_counts.items()}
-
-    if 'county' in recent.columns:
-        county_counts = recent[recent['county'] != '']['county'].value_counts().head(30).to_dict()
-        result["by_county"] = {str(k): int(v) for k, v in county_counts.items()}
-
-    if 'permit_date' in recent.columns and not recent['permit_date'].isna().all():
-        daily = recent.groupby(recent['permit_date'].dt.date).size()
-        result["daily_counts"] = [
-            {"date": str(date), "count": int(count)}
-            for date, count in daily.items()
-        ]
-
-    if 'county' in recent.columns:
-        result["permit_velocity"] = {
-            str(k): int(v)
-            for k, v in recent[recent['county'] != '']['county'].value_counts().to_dict().items()
-        }
+    # Run all summaries as one batch so Polars shares the scan, date parse and
+    # filter across them instead of executing the plan once per summary
+    total, basin_counts, county_counts, daily = pl.collect_all([
+        recent.select(pl.len()),
+        recent.group_by('basin').len().sort(['len', 'basin'], descending=[True, False]),
+        recent.filter(pl.col('county') != '')
+        .group_by('county').len()
+        .sort(['len', 'county'], descending=[True, False]),
+        recent.group_by('permit_date').len().sort('permit_date'),
+    ])
+
+    result["total_permits_30d"] = total.item()
+    result["by_basin"] = {str(k): int(v) for k, v in basin_counts.iter_rows()}
+    result["by_county"] = {str(k): int(v) for k, v in county_counts.head(30).iter_rows()}
+    result["permit_velocity"] = {str(k): int(v) for k, v in county_counts.iter_rows()}
+    result["daily_counts"] = [
+        {"date": str(date), "count": int(count)}
+        for date, count in daily.iter_rows()
+    ]
 
     return result
 
@@ -261,8 +291,8 @@ def main():
         summary = process_permit_data(permits)
         if summary:
             output_file = output_dir / "rrc_permits.json"
-            with open(output_file, "w") as f:
-                json.dump(summary, f, indent=2, default=str)
+            with open(output_file, "wb") as f:
+                f.write(orjson.dumps(summary, option=ORJSON_OPTIONS))
             print(f"RRC permit data saved to {output_file}")
             print(f"  Total permits (30d): {summary['total_permits_30d']}")
             print(f"  Basins tracked: {len(summary['by_basin'])}")
@@ -0,0 +1,102 @@
+"""
+Helpers shared by the data collection pipelines:
+pooled HTTP session, dashboard JSON options, RRC MFT form state, and Parquet
+cache for parsed RRC MFT downloads.
+"""
+
+import html
+import json
+import re
+from pathlib import Path
+
+import orjson
+import polars as pl
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared HTTP session: keep-alive connection pooling plus retries
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10, pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.5),
+))
+
+# Dashboard JSON output: indented, with datetimes and NumPy scalars serialized natively
+ORJSON_OPTIONS = (
+    orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+)
+
+# PrimeFaces form state token on the RRC MFT share page
+VIEWSTATE_RE = re.compile(r'name="javax\.faces\.ViewState"[^>]*value="([^"]+)"')
+
+# Parsed MFT downloads are cached here and reused while the source file is unchanged
+CACHE_DIR = Path(__file__).parent / '.cache'
+
+# Bump whenever a parser's output changes shape, so caches restored by CI from
+# an older revision are re-parsed instead of reused
+CACHE_VERSION = 1
+
+
+def extract_viewstate(text):
+    """Return the unescaped PrimeFaces ViewState from an MFT share page, or None."""
+    match = VIEWSTATE_RE.search(text)
+    return html.unescape(match.group(1)) if match else None
+
+
+def source_fingerprint(response):
+    """
+    Identify the version of a downloaded MFT file from its response headers.
+    Needs Last-Modified or ETag; Content-Length is only checked alongside them,
+    since on its own it just reflects the record count of a fixed-width file.
+    Returns None when the version can't be identified.
+    """
+    fingerprint = {h: response.headers[h] for h in ('Last-Modified', 'ETag')
+                   if response.headers.get(h)}
+    if not fingerprint:
+        return None
+    if response.headers.get('Content-Length'):
+        fingerprint['Content-Length'] = response.headers['Content-Length']
+    return fingerprint
+
+
+def cache_key(fingerprint, params):
+    """Sidecar contents identifying both the source file and how it was parsed."""
+    return {'cache_version': CACHE_VERSION, 'source': fingerprint, 'params': params}
+
+
+def load_cached(name, fingerprint, params=None):
+    """
+    Return the cached parse of an MFT file if it came from the same file version
+    and was produced by the same cache version and parser params.
+    """
+    data_file = CACHE_DIR / f'{name}.parquet'
+    meta_file = CACHE_DIR / f'{name}.json'
+    if not fingerprint or not data_file.exists() or not meta_file.exists():
+        return None
+    try:
+        if json.loads(meta_file.read_text()) != cache_key(fingerprint, params):
+            return None
+        return pl.read_parquet(data_file)
+    except Exception as e:
+        print(f"Ignoring unreadable cache {data_file}: {e}")
+        return None
+
+
+def save_cache(name, fingerprint, df, params=None):
+    """
+    Cache a parsed MFT file as Parquet, keyed on its source fingerprint and parser params.
+    Failures are logged and ignored; the cache is only an optimization.
+    """
+    if not fingerprint:
+        return
+    data_file = CACHE_DIR / f'{name}.parquet'
+    meta_file = CACHE_DIR / f'{name}.json'
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Drop the sidecar first so a half-written Parquet file is never matched
+        meta_file.unlink(missing_ok=True)
+        df.write_parquet(data_file, compression='zstd')
+        meta_file.write_text(json.dumps(cache_key(fingerprint, params)))
+    except Exception as e:
+        print(f"Could not write cache {data_file}: {e}")
@@ -5,7 +5,9 @@ Orchestrates fetching from ERCOT, RRC permits, and RRC enforcement.
 """
 
 import json
+import multiprocessing
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -14,6 +16,12 @@ from fetch_ercot import main as fetch_ercot
 from fetch_rrc_permits import main as fetch_permits
 from fetch_rrc_enforcement import main as fetch_enforcement
 
+PIPELINES = [
+    ("ercot", fetch_ercot),
+    ("rrc_permits", fetch_permits),
+    ("rrc_enforcement", fetch_enforcement),
+]
+
 
 def now_iso():
     return datetime.now(timezone.utc).isoformat()
@@ -32,53 +40,33 @@ def run_all_pipelines():
         "pipelines": {}
     }
 
-    # Run ERCOT pipeline
-    print("\n[1/3] Running ERCOT pipeline...")
-    try:
-        ercot_success = fetch_ercot()
-        results["pipelines"]["ercot"] = {
-            "status": "success" if ercot_success else "failed",
-            "timestamp": now_iso()
-        }
-    except Exception as e:
-        print(f"ERCOT pipeline error: {e}")
-        results["pipelines"]["ercot"] = {
-            "status": "error",
-            "error": str(e),
-            "timestamp": now_iso()
-        }
-
-    # Run RRC Permits pipeline
-    print("\n[2/3] Running RRC Permits pipeline...")
-    try:
-        permits_success = fetch_permits()
-        results["pipelines"]["rrc_permits"] = {
-            "status": "success" if permits_success else "failed",
-            "timestamp": now_iso()
-        }
-    except Exception as e:
-        print(f"RRC Permits pipeline error: {e}")
-        results["pipelines"]["rrc_permits"] = {
-            "status": "error",
-            "error": str(e),
-            "timestamp": now_iso()
-        }
-
-    # Run RRC Enforcement pipeline
-    print("\n[3/3] Running RRC Enforcement pipeline...")
-    try:
-        enforcement_success = fetch_enforcement()
-        results["pipelines"]["rrc_enforcement"] = {
-            "status": "success" if enforcement_success else "failed",
-            "timestamp": now_iso()
-        }
-    except Exception as e:
-        print(f"RRC Enforcement pipeline error: {e}")
-        results["pipelines"]["rrc_enforcement"] = {
-            "status": "error",
-            "error": str(e),
-            "timestamp": now_iso()
-        }
+    # Pipelines hit different hosts and are independent, so run them in
+    # parallel processes (pandas/polars work holds the GIL). Workers are
+    # spawned rather than forked: forking after Polars has started its
+    # thread pool can deadlock the child
+    print(f"\nRunning {len(PIPELINES)} pipelines in parallel...")
+    statuses = {}
+    with ProcessPoolExecutor(max_workers=len(PIPELINES),
+                             mp_context=multiprocessing.get_context("spawn")) as ex:
+        futures = {ex.submit(fn): name for name, fn in PIPELINES}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                success = future.result()
+                statuses[name] = {
+                    "status": "success" if success else "failed",
+                    "timestamp": now_iso()
+                }
+            except Exception as e:
+                print(f"{name} pipeline error: {e}")
+                statuses[name] = {
+                    "status": "error",
+                    "error": str(e),
+                    "timestamp": now_iso()
+                }
+
+    # Keep a stable pipeline order in the status file
+    results["pipelines"] = {name: statuses[name] for name, _ in PIPELINES}
 
     # Save pipeline status
     output_dir = Path(__file__).parent.parent / "public" / "data"